@@ -1,4 +1,10 @@
+import asyncio
+import hashlib
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import streamlit as st
 from dotenv import load_dotenv
 
@@ -11,62 +17,183 @@ if not gemini_key:
     st.stop()
 
 # ───── Local Module Imports ─────
+from backend.cache import cached_call, cached_call_async
 from backend.file_parser import extract_text
-from backend.summarizer import summarise_document
-from backend.qa_engine import answer_question
+from backend.gemini_client import truncate_for_prompt
+from backend.summarizer import summarise_document, summarise_document_async
+from backend.qa_engine import embed_text, split_answer, stream_answer
+from backend.retriever import build_index, top_k_chunks
 from backend.challenge import (
     generate_quiz,
+    generate_quiz_async,
     evaluate_answer,
     generate_subjective_questions,
+    generate_subjective_questions_async,
     evaluate_subjective
 )
 
-# ───── Streamlit UI Setup ─────
-st.set_page_config("Smart Research Assistant (Gemini)", "🧠", layout="wide")
-st.title("🧠 Smart Assistant For Research Summarization")
+# ───── Cached Helpers ─────
+@st.cache_resource
+def _extraction_jobs() -> dict:
+    # Process-wide so a finished extraction is reused by later reruns and sessions.
+    return {"pool": ThreadPoolExecutor(max_workers=2), "lock": threading.Lock(), "jobs": {}}
 
-uploaded_file = st.file_uploader("📂 Upload a PDF or TXT file", type=["pdf", "txt"])
+def _extraction_job(file_bytes: bytes, doc_hash: str, file_type: str) -> dict:
+    """Return the background extraction job for this upload, starting it if needed."""
+    registry = _extraction_jobs()
+    with registry["lock"]:
+        job = registry["jobs"].get(doc_hash)
+        if job is None:
+            progress = {"done": 0, "total": 0}
 
-if uploaded_file:
-    with st.spinner("📄 Extracting document text..."):
-        doc_text = extract_text(uploaded_file)
+            def report(done: int, total: int) -> None:
+                progress.update(done=done, total=total)
 
-    if not doc_text.strip():
-        st.error("⚠️ No text extracted. Please upload a valid text-based document.")
-        st.stop()
+            future = registry["pool"].submit(extract_text, file_bytes, file_type, report)
+            job = registry["jobs"][doc_hash] = {"future": future, "progress": progress}
+        return job
 
-    st.session_state["doc_text"] = doc_text
+# Bump to invalidate cached Gemini responses after prompt changes.
+CACHE_VERSION = "v2"
 
-    # ───── Summary ─────
-    if "summary" not in st.session_state:
-        with st.spinner("🧠 Generating summary..."):
-            try:
-                st.session_state["summary"] = summarise_document(doc_text, gemini_key)
-            except Exception as e:
-                st.error(f"❌ Summarization error: {e}")
-                st.stop()
+# Leading-underscore params are excluded from the cache key by Streamlit,
+# so the API key never becomes part of it.
+@st.cache_data(ttl=86400, show_spinner=False)
+def _cached_summary(doc_text: str, _api_key: str, version: str = CACHE_VERSION) -> str:
+    return cached_call("summary", doc_text, {"version": version},
+                       lambda: summarise_document(doc_text, _api_key))
 
-    st.subheader("📑 Document Summary")
-    st.write(st.session_state["summary"])
+@st.cache_data(ttl=86400, show_spinner=False)
+def _cached_quiz(doc_text: str, _api_key: str, num_questions: int = 5, version: str = CACHE_VERSION) -> list:
+    return cached_call("quiz", doc_text, {"num_questions": num_questions, "version": version},
+                       lambda: generate_quiz(doc_text, _api_key, num_questions))
+
+@st.cache_data(ttl=86400, show_spinner=False)
+def _cached_subjective(doc_text: str, _api_key: str, num_questions: int = 3, version: str = CACHE_VERSION) -> list:
+    return cached_call("subjective", doc_text, {"num_questions": num_questions, "version": version},
+                       lambda: generate_subjective_questions(doc_text, _api_key, num_questions))
+
+@st.cache_resource
+def _prefetch_loop() -> asyncio.AbstractEventLoop:
+    # One long-lived loop: async gRPC channels are bound to the loop that created them.
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return loop
+
+def _start_prefetch(doc_text: str) -> None:
+    """Fire summary, quiz and subjective generation concurrently in the background."""
+    if st.session_state.get("prefetch") is not None:
+        return
+
+    jobs = {
+        "summary": cached_call_async(
+            "summary", doc_text, {"version": CACHE_VERSION},
+            lambda: summarise_document_async(doc_text, gemini_key)),
+        "quiz": cached_call_async(
+            "quiz", doc_text, {"num_questions": 5, "version": CACHE_VERSION},
+            lambda: generate_quiz_async(doc_text, gemini_key, 5)),
+        "subjective": cached_call_async(
+            "subjective", doc_text, {"num_questions": 3, "version": CACHE_VERSION},
+            lambda: generate_subjective_questions_async(doc_text, gemini_key, 3)),
+    }
+    loop = _prefetch_loop()
+    st.session_state["prefetch"] = {
+        op: asyncio.run_coroutine_threadsafe(coro, loop) for op, coro in jobs.items()
+    }
+
+def _prefetched(op: str, fallback):
+    """Wait for a prefetched result, retrying synchronously if the prefetch failed."""
+    future = st.session_state["prefetch"][op]
+    try:
+        return future.result()
+    except Exception:
+        return fallback()
+
+@st.cache_data(ttl=86400, show_spinner=False)
+def _cached_index(doc_text: str, _api_key: str, version: str = CACHE_VERSION):
+    return build_index(doc_text, _api_key)
+
+def _qa_context(doc_text: str, vec) -> str:
+    """Top-k passages for the question, or the whole document if retrieval is unavailable."""
+    if vec is None:
+        return doc_text
+    try:
+        chunks, embs = _cached_index(doc_text, gemini_key)
+    except RuntimeError:
+        return doc_text
+    return top_k_chunks(chunks, embs, vec)
 
-    # ───── Q&A ─────
+# Cosine similarity above which a previous question counts as a paraphrase.
+QA_CACHE_THRESHOLD = 0.92
+
+def _qa_cache(doc_hash: str) -> dict:
+    caches = st.session_state.setdefault("qa_cache", {})
+    return caches.setdefault(doc_hash, {"embs": None, "items": []})
+
+def _lookup_answer(doc_hash: str, question: str):
+    """Return (cached_result_or_None, question_embedding_or_None)."""
+    try:
+        vec = embed_text(question, gemini_key)
+    except RuntimeError:
+        return None, None
+
+    cache = _qa_cache(doc_hash)
+    if cache["embs"] is not None:
+        sims = cache["embs"] @ vec
+        best = int(sims.argmax())
+        if sims[best] > QA_CACHE_THRESHOLD:
+            return cache["items"][best][1], vec
+    return None, vec
+
+def _store_answer(doc_hash: str, vec, question: str, result: dict) -> None:
+    if vec is None:
+        return
+    cache = _qa_cache(doc_hash)
+    cache["embs"] = vec[None, :] if cache["embs"] is None else np.vstack([cache["embs"], vec])
+    cache["items"].append((question, result))
+
+# ───── UI Panels ─────
+# Fragments rerun on their own, so interacting with one panel
+# doesn't re-execute the whole script.
+# ───── Q&A ─────
+@st.fragment
+def qa_panel(doc_hash: str, doc_text: str) -> None:
     st.markdown("---")
     st.subheader("💬 Ask Anything")
 
-    question = st.text_input("Ask a question based on the document:")
-    if question:
+    with st.form("qa_form", clear_on_submit=False):
+        question = st.text_input("Ask a question based on the document:")
+        submitted = st.form_submit_button("Ask")
+
+    if submitted and question.strip():
+        st.session_state.pop("qa_result", None)
         with st.spinner("🤖 Thinking with Gemini..."):
-            try:
-                result = answer_question(doc_text, question, gemini_key)
-                st.markdown("**Answer:**")
-                st.write(result["answer"])
-                if result.get("justification"):
-                    st.markdown("**Justification:**")
-                    st.write(result["justification"])
-            except Exception as e:
-                st.error(f"❌ Q&A error: {e}")
+            result, vec = _lookup_answer(doc_hash, question)
+        try:
+            if result is None:
+                # Show tokens as they arrive, then swap in the formatted answer below.
+                live = st.empty()
+                with live.container():
+                    st.markdown("**Answer:**")
+                    content = st.write_stream(stream_answer(_qa_context(doc_text, vec), question, gemini_key))
+                live.empty()
+                result = split_answer(content)
+                _store_answer(doc_hash, vec, question, result)
+            st.session_state["qa_result"] = result
+        except Exception as e:
+            st.error(f"❌ Q&A error: {e}")
+
+    if "qa_result" in st.session_state:
+        result = st.session_state["qa_result"]
+        st.markdown("**Answer:**")
+        st.write(result["answer"])
+        if result.get("justification"):
+            st.markdown("**Justification:**")
+            st.write(result["justification"])
 
-    # ───── Challenge Me ─────
+# ───── Challenge Me ─────
+@st.fragment
+def challenge_panel(prompt_text: str) -> None:
     st.markdown("---")
     st.subheader("🧠 Challenge Me Mode")
 
@@ -76,12 +203,13 @@ if uploaded_file:
         with st.spinner("🧠 Generating challenge..."):
             try:
                 if challenge_type.startswith("Objective"):
-                    quiz = generate_quiz(doc_text, gemini_key)
+                    quiz = _prefetched("quiz", lambda: _cached_quiz(prompt_text, gemini_key))
                     st.session_state["quiz"] = quiz
                     st.session_state.pop("subjective", None)
                     st.success(f"✅ {len(quiz)} objective questions generated.")
                 else:
-                    subjective = generate_subjective_questions(doc_text, gemini_key)
+                    subjective = _prefetched(
+                        "subjective", lambda: _cached_subjective(prompt_text, gemini_key))
                     st.session_state["subjective"] = subjective
                     st.session_state.pop("quiz", None)
                     st.success(f"✅ {len(subjective)} subjective questions generated.")
@@ -91,7 +219,6 @@ if uploaded_file:
     # ───── Objective Quiz ─────
     if "quiz" in st.session_state:
         st.markdown("### 📝 Objective Quiz")
-        score = 0
         responses = []
 
         for i, q in enumerate(st.session_state["quiz"], start=1):
@@ -108,19 +235,20 @@ if uploaded_file:
 
         if st.button("✅ Submit Objective Answers"):
             st.markdown("### 🧾 Answer Review:")
-            for i, resp in enumerate(responses, start=1):
+            user_letters = np.array([r["user_choice"].strip().upper()[:1] for r in responses])
+            correct_letters = np.array([r["correct_option"] for r in responses])
+            is_correct = user_letters == correct_letters
+            score = int(is_correct.sum())
+
+            for i, (resp, letter, correct) in enumerate(zip(responses, correct_letters, is_correct), start=1):
                 user = resp["user_choice"]
-                correct_letter = resp["correct_option"]
-                correct_option = next(
-                    (opt for opt in resp["options"] if opt.strip().upper().startswith(correct_letter.upper())),
-                    None
-                )
-                is_correct = user.strip().upper().startswith(correct_letter.upper())
-
-                if is_correct:
+                if correct:
                     st.success(f"✅ Q{i}: Correct!\n\n**You answered:** {user}")
-                    score += 1
                 else:
+                    correct_option = next(
+                        (opt for opt in resp["options"] if opt.strip().upper().startswith(letter)),
+                        None
+                    )
                     st.error(f"❌ Q{i}: Incorrect.")
                     st.markdown(f"**Your answer:** {user}")
                     st.markdown(f"**Correct answer:** {correct_option}")
@@ -139,13 +267,71 @@ if uploaded_file:
 
         if st.button("✅ Submit Subjective Answers"):
             st.markdown("### 🧾 Feedback:")
-            for i, (question, answer) in enumerate(subjective_answers, start=1):
+            with st.spinner("🔍 Evaluating..."):
+                with ThreadPoolExecutor(max_workers=max(1, min(8, len(subjective_answers)))) as ex:
+                    feedbacks = list(ex.map(
+                        lambda qa: evaluate_subjective(qa[1], qa[0], gemini_key),
+                        subjective_answers
+                    ))
+            for i, ((question, answer), feedback) in enumerate(zip(subjective_answers, feedbacks), start=1):
                 st.markdown(f"**Q{i}. {question}**")
                 st.markdown(f"🖊️ Your Answer:\n{answer if answer.strip() else '_No answer provided._'}")
-                with st.spinner("🔍 Evaluating..."):
-                    feedback = evaluate_subjective(answer, question, gemini_key)
                 st.markdown(f"📋 **Evaluation:** {feedback}")
                 st.markdown("---")
 
+# ───── Streamlit UI Setup ─────
+st.set_page_config("Smart Research Assistant (Gemini)", "🧠", layout="wide")
+st.title("🧠 Smart Assistant For Research Summarization")
+
+uploaded_file = st.file_uploader("📂 Upload a PDF or TXT file", type=["pdf", "txt"])
+
+if uploaded_file:
+    raw = uploaded_file.getvalue()
+    doc_hash = hashlib.sha256(raw).hexdigest()
+    job = _extraction_job(raw, doc_hash, uploaded_file.type)
+
+    # Poll the worker so the page counter updates instead of the UI freezing.
+    if not job["future"].done():
+        done, total = job["progress"]["done"], job["progress"]["total"]
+        label = f"📄 Extracting document text... {done}/{total} pages" if total else "📄 Extracting document text..."
+        st.progress(done / total if total else 0.0, text=label)
+        time.sleep(0.3)
+        st.rerun()
+
+    doc_text = job["future"].result()
+
+    if not doc_text.strip():
+        st.error("⚠️ No text extracted. Please upload a valid text-based document.")
+        st.stop()
+
+    # Only touch session state when a different document is uploaded.
+    if st.session_state.get("doc_hash") != doc_hash:
+        for stale in ("summary", "qa_result", "quiz", "subjective", "prefetch"):
+            st.session_state.pop(stale, None)
+        st.session_state["doc_text"] = doc_text
+        st.session_state["doc_text_trunc"] = truncate_for_prompt(doc_text)
+        st.session_state["doc_name"] = uploaded_file.name
+        st.session_state["doc_hash"] = doc_hash
+
+    # Word-safe prompt view of the document, computed once per upload.
+    prompt_text = st.session_state["doc_text_trunc"]
+    _start_prefetch(prompt_text)
+
+    # ───── Summary ─────
+    if "summary" not in st.session_state:
+        with st.spinner("🧠 Generating summary..."):
+            try:
+                st.session_state["summary"] = _prefetched(
+                    "summary", lambda: _cached_summary(prompt_text, gemini_key))
+            except Exception as e:
+                st.error(f"❌ Summarization error: {e}")
+                st.stop()
+
+    st.subheader("📑 Document Summary")
+    st.write(st.session_state["summary"])
+
+    qa_panel(doc_hash, doc_text)
+    challenge_panel(prompt_text)
+
 else:
     st.info("📥 Please upload a PDF or TXT file to get started.")
@@ -0,0 +1,45 @@
+"""
+Persistent Gemini response cache
+--------------------------------
+Stores generated summaries and challenges on disk so they survive
+Streamlit process/container restarts, unlike st.cache_data.
+"""
+
+import hashlib
+import os
+from typing import Any, Awaitable, Callable
+import diskcache
+
+CACHE_DIR = os.getenv("GEMINI_CACHE_DIR", "/tmp/gemini_cache")
+CACHE_EXPIRE = 7 * 86400    # seconds
+
+_CACHE = diskcache.Cache(CACHE_DIR)
+
+def _key(op: str, doc_text: str, params: dict) -> str:
+    return hashlib.sha256((op + doc_text + repr(sorted(params.items()))).encode()).hexdigest()
+
+def cached_call(op: str, doc_text: str, params: dict, fn: Callable[[], Any]) -> Any:
+    """
+    Return the stored result for (op, doc_text, params), computing it with fn() on a miss.
+    """
+    key = _key(op, doc_text, params)
+    value = _CACHE.get(key)
+    if value is not None:
+        return value
+
+    value = fn()
+    _CACHE.set(key, value, expire=CACHE_EXPIRE)
+    return value
+
+async def cached_call_async(op: str, doc_text: str, params: dict, fn: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    Async counterpart of cached_call; fn returns an awaitable.
+    """
+    key = _key(op, doc_text, params)
+    value = _CACHE.get(key)
+    if value is not None:
+        return value
+
+    value = await fn()
+    _CACHE.set(key, value, expire=CACHE_EXPIRE)
+    return value
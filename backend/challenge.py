@@ -6,59 +6,114 @@ Supports:
 2. Generating descriptive (subjective) questions
 3. Evaluating objective answers
 4. Evaluating subjective answers
+
+Generators also have *_async variants for concurrent prefetching.
+Document text is expected pre-truncated (see gemini_client.truncate_for_prompt).
 """
 
-import google.generativeai as genai
-import json
+import orjson
 import re
-from typing import List, Dict
+from typing import List, Dict, Optional
+from backend.gemini_client import get_model
 
-def _get_model(api_key: str):
-    genai.configure(api_key=api_key)
-    return genai.GenerativeModel(model_name="models/gemini-1.5-flash-latest")
+_NUM_PREFIX = re.compile(r'^\s*\d+[\.\):\-]\s*')
+MIN_DOCUMENT_WORDS = 50
 
-def generate_quiz(document_text: str, api_key: str, num_questions: int = 5) -> List[Dict]:
-    model = _get_model(api_key)
+# Constrained decoding: Gemini must return exactly this shape, so no text parsing is needed.
+_QUIZ_SCHEMA = {
+    "type": "ARRAY",
+    "items": {
+        "type": "OBJECT",
+        "properties": {
+            "question": {"type": "STRING"},
+            "options": {"type": "ARRAY", "items": {"type": "STRING"}},
+            "correct_option": {"type": "STRING"},
+        },
+        "required": ["question", "options", "correct_option"],
+    },
+}
+_QUIZ_CONFIG = {"response_mime_type": "application/json", "response_schema": _QUIZ_SCHEMA}
 
-    prompt = (
+def _check_document(document_text: str) -> None:
+    # Skip the API call entirely when there is too little text to quiz on.
+    if not document_text or len(document_text.split()) < MIN_DOCUMENT_WORDS:
+        raise ValueError("Document too short for quiz generation")
+
+def _generate_streamed(model, prompt: str, generation_config: Optional[dict] = None) -> str:
+    # Streaming starts the reply sooner; output is only parsed once complete.
+    response = model.generate_content(prompt, generation_config=generation_config, stream=True)
+    return "".join(chunk.text for chunk in response)
+
+def _quiz_prompt(document_text: str, num_questions: int) -> str:
+    return (
         f"Read the following document and generate {num_questions} MCQs.\n"
         f"Each question must have 4 options and the correct answer clearly marked with a letter A/B/C/D.\n"
-        f"Return output strictly in this JSON format:\n"
-        f'[{{"question": "...", "options": ["A. ...", "B. ...", "C. ...", "D. ..."], "correct_option": "A"}}, ...]\n\n'
-        f"Document:\n{document_text[:10000]}"
+        f'Prefix each option with its letter ("A. ...") and set correct_option to the letter only.\n\n'
+        f"Document:\n{document_text}"
     )
 
+def _parse_quiz(content: str) -> List[Dict]:
     try:
-        response = model.generate_content(prompt)
-        content = response.text.strip()
+        quiz = orjson.loads(content)
+    except orjson.JSONDecodeError:
+        raise RuntimeError(f"Invalid JSON returned: {content[:300]}...")
 
-        try:
-            return json.loads(content)
-        except json.JSONDecodeError:
-            match = re.search(r'\[\s*{.*?}\s*\]', content, re.DOTALL)
-            if match:
-                return json.loads(match.group(0))
+    # Normalise answer keys to a single uppercase letter so scoring is a plain comparison.
+    for q in quiz:
+        q["correct_option"] = q["correct_option"].strip().upper()[:1]
+    return quiz
 
-        raise RuntimeError(f"Invalid JSON returned: {content[:300]}...")
+def _subjective_prompt(document_text: str, num_questions: int) -> str:
+    return (
+        f"From the document below, generate {num_questions} descriptive questions.\n"
+        f"Do NOT include answers or any extra text.\n\n"
+        f"Document:\n{document_text}"
+    )
+
+def _parse_subjective(raw: str, num_questions: int) -> List[str]:
+    questions = [_NUM_PREFIX.sub("", line).strip()
+                 for line in raw.strip().splitlines() if line.strip()]
+    return questions[:num_questions]
 
+def generate_quiz(document_text: str, api_key: str, num_questions: int = 5) -> List[Dict]:
+    _check_document(document_text)
+    model = get_model(api_key)
+
+    try:
+        content = _generate_streamed(model, _quiz_prompt(document_text, num_questions), _QUIZ_CONFIG)
+        return _parse_quiz(content)
+    except Exception as e:
+        raise RuntimeError(f"Gemini quiz generation error: {e}")
+
+async def generate_quiz_async(document_text: str, api_key: str, num_questions: int = 5) -> List[Dict]:
+    _check_document(document_text)
+    model = get_model(api_key)
+
+    try:
+        response = await model.generate_content_async(
+            _quiz_prompt(document_text, num_questions), generation_config=_QUIZ_CONFIG
+        )
+        return _parse_quiz(response.text)
     except Exception as e:
         raise RuntimeError(f"Gemini quiz generation error: {e}")
 
 def generate_subjective_questions(document_text: str, api_key: str, num_questions: int = 3) -> List[str]:
-    model = _get_model(api_key)
+    _check_document(document_text)
+    model = get_model(api_key)
 
-    prompt = (
-        f"From the document below, generate {num_questions} descriptive questions.\n"
-        f"Do NOT include answers or any extra text.\n\n"
-        f"Document:\n{document_text[:10000]}"
-    )
+    try:
+        raw = _generate_streamed(model, _subjective_prompt(document_text, num_questions))
+        return _parse_subjective(raw, num_questions)
+    except Exception as e:
+        raise RuntimeError(f"Gemini subjective Q generation error: {e}")
+
+async def generate_subjective_questions_async(document_text: str, api_key: str, num_questions: int = 3) -> List[str]:
+    _check_document(document_text)
+    model = get_model(api_key)
 
     try:
-        response = model.generate_content(prompt)
-        raw = response.text.strip()
-        questions = [re.sub(r"^\s*\d+[\).]?\s*", "", line).strip()
-                     for line in raw.splitlines() if line.strip()]
-        return questions[:num_questions]
+        response = await model.generate_content_async(_subjective_prompt(document_text, num_questions))
+        return _parse_subjective(response.text, num_questions)
     except Exception as e:
         raise RuntimeError(f"Gemini subjective Q generation error: {e}")
 
@@ -66,7 +121,7 @@ def evaluate_answer(user_answer: str, correct_answer: str) -> bool:
     return user_answer.strip().upper().startswith(correct_answer.strip().upper())
 
 def evaluate_subjective(user_answer: str, question: str, api_key: str) -> str:
-    model = _get_model(api_key)
+    model = get_model(api_key)
 
     prompt = (
         f"You are an evaluator. Read the question and the student's answer.\n"
@@ -1,22 +1,45 @@
-from PyPDF2 import PdfReader
-from io import StringIO
+import fitz  # PyMuPDF
+from typing import Callable, Iterator, Optional
 import streamlit as st
 
-def extract_text(file) -> str:
-    """Extract plain text from PDF or TXT file."""
-    file_type = getattr(file, "type", None)
+def _iter_page_text(doc, progress_cb: Optional[Callable[[int, int], None]]) -> Iterator[str]:
+    total = doc.page_count
+    for i, page in enumerate(doc, start=1):
+        yield page.get_text("text")
+        if progress_cb:
+            progress_cb(i, total)
+
+def _as_buffer(file):
+    # Raw bytes are used as-is; file-like uploads are viewed or read once.
+    if isinstance(file, (bytes, bytearray, memoryview)):
+        return file
+    if hasattr(file, "getbuffer"):
+        return file.getbuffer()
+    return file.read()
+
+def extract_text(
+    file,
+    file_type: Optional[str] = None,
+    progress_cb: Optional[Callable[[int, int], None]] = None,
+) -> str:
+    """
+    Extract plain text from a PDF or TXT upload (file-like or raw bytes),
+    reporting (pages_done, total) for PDFs.
+    """
+    file_type = file_type or getattr(file, "type", None)
 
     if file_type == "application/pdf":
         try:
-            reader = PdfReader(file)
-            return "\n".join((page.extract_text() or "") for page in reader.pages)
+            # Hand MuPDF the in-memory upload directly rather than a second copy.
+            with fitz.open(stream=_as_buffer(file), filetype="pdf") as doc:
+                return "\n".join(_iter_page_text(doc, progress_cb))
         except Exception as e:
             st.error(f"Error reading PDF: {e}")
             return ""
 
     if file_type == "text/plain":
         try:
-            return StringIO(file.getvalue().decode("utf-8", "ignore")).read()
+            return str(_as_buffer(file), "utf-8", errors="replace")
         except Exception as e:
             st.error(f"Error reading TXT: {e}")
             return ""
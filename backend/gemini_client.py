@@ -0,0 +1,32 @@
+"""
+Shared Gemini client setup
+--------------------------
+Configures the SDK and builds the model once per process so backend
+calls don't redo it on every Streamlit rerun.
+"""
+
+import functools
+import google.generativeai as genai
+
+MODEL_NAME = "models/gemini-1.5-flash-latest"
+PROMPT_CHAR_BUDGET = 10000
+
+def truncate_for_prompt(text: str, max_chars: int = PROMPT_CHAR_BUDGET) -> str:
+    """
+    Cut text to max_chars at the last whitespace so no word is split.
+    Compute once per document and pass the result to the backend generators.
+    """
+    if len(text) <= max_chars:
+        return text
+    cut = max(text.rfind(ws, 0, max_chars + 1) for ws in " \n\t")
+    return text[:cut if cut > 0 else max_chars]
+
+@functools.lru_cache(maxsize=4)
+def configure(api_key: str) -> None:
+    # gRPC keeps one HTTP/2 connection warm for all calls in this process.
+    genai.configure(api_key=api_key, transport="grpc")
+
+@functools.lru_cache(maxsize=4)
+def get_model(api_key: str) -> genai.GenerativeModel:
+    configure(api_key)
+    return genai.GenerativeModel(model_name=MODEL_NAME)
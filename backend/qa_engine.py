@@ -1,29 +1,66 @@
 import google.generativeai as genai
+import numpy as np
+from typing import Iterator
+from backend.gemini_client import configure, get_model
 
-def answer_question(document_text: str, question: str, api_key: str) -> dict:
+def embed_text(text: str, api_key: str, task_type: str = "retrieval_query") -> np.ndarray:
     """
-    Use Gemini 1.5 Pro to answer a question and provide justification.
+    Return a unit-normalised Gemini embedding so dot products are cosine similarities.
     """
-    genai.configure(api_key=api_key)
+    configure(api_key)
 
     try:
-        model = genai.GenerativeModel(model_name="models/gemini-1.5-flash-latest")
+        result = genai.embed_content(
+            model="models/text-embedding-004", content=text, task_type=task_type
+        )
+        vec = np.asarray(result["embedding"], dtype=np.float32)
+        return vec / np.linalg.norm(vec)
+    except Exception as e:
+        raise RuntimeError(f"Gemini embedding error: {e}")
 
+def _build_prompt(document_text: str, question: str) -> str:
+    return (
+        f"You are a helpful assistant. Use ONLY the content in the following document.\n\n"
+        f"DOCUMENT:\n{document_text[:12000]}\n\n"
+        f"QUESTION:\n{question}\n\n"
+        "Answer the question, then add a 'Justification:' section quoting the supporting line."
+    )
 
-        prompt = (
-            f"You are a helpful assistant. Use ONLY the content in the following document.\n\n"
-            f"DOCUMENT:\n{document_text[:12000]}\n\n"
-            f"QUESTION:\n{question}\n\n"
-            "Answer the question, then add a 'Justification:' section quoting the supporting line."
-        )
+def split_answer(content: str) -> dict:
+    """
+    Split a raw Gemini reply into its answer and 'Justification:' parts.
+    """
+    content = content.strip()
+    if "Justification:" in content:
+        answer, justification = content.split("Justification:", 1)
+        return {"answer": answer.strip(), "justification": justification.strip()}
 
-        response = model.generate_content(prompt)
-        content = response.text.strip()
+    return {"answer": content, "justification": ""}
 
-        if "Justification:" in content:
-            answer, justification = content.split("Justification:", 1)
-            return {"answer": answer.strip(), "justification": justification.strip()}
+def answer_question(document_text: str, question: str, api_key: str) -> dict:
+    """
+    Use Gemini 1.5 Pro to answer a question and provide justification.
+    """
+    if not question.strip():
+        return {"answer": "", "justification": ""}
+
+    try:
+        model = get_model(api_key)
+        response = model.generate_content(_build_prompt(document_text, question))
+        return split_answer(response.text)
+    except Exception as e:
+        raise RuntimeError(f"Gemini Q&A error: {e}")
 
-        return {"answer": content, "justification": ""}
+def stream_answer(document_text: str, question: str, api_key: str) -> Iterator[str]:
+    """
+    Yield the raw Gemini reply chunk by chunk; pass the joined text to split_answer.
+    """
+    if not question.strip():
+        return
+
+    try:
+        model = get_model(api_key)
+        for chunk in model.generate_content(_build_prompt(document_text, question), stream=True):
+            yield chunk.text
     except Exception as e:
         raise RuntimeError(f"Gemini Q&A error: {e}")
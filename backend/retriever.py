@@ -0,0 +1,50 @@
+"""
+Document Retriever – chunk, embed once, fetch top-k passages per question
+--------------------------------------------------------------------------
+Lets Q&A send only the passages relevant to a question instead of the
+first 12 000 characters of the document on every call.
+"""
+
+import google.generativeai as genai
+import numpy as np
+from typing import List, Tuple
+from backend.gemini_client import configure
+
+EMBED_MODEL = "models/text-embedding-004"
+CHUNK_WORDS = 375     # ≈ 500 tokens
+EMBED_BATCH = 100     # API limit per batch request
+
+def chunk_text(text: str, chunk_words: int = CHUNK_WORDS) -> List[str]:
+    words = text.split()
+    return [" ".join(words[i:i + chunk_words]) for i in range(0, len(words), chunk_words)]
+
+def build_index(text: str, api_key: str) -> Tuple[List[str], np.ndarray]:
+    """
+    Split the document and return (chunks, unit-normalised float32 embedding matrix).
+    """
+    configure(api_key)
+    chunks = chunk_text(text)
+
+    try:
+        vectors = []
+        for i in range(0, len(chunks), EMBED_BATCH):
+            result = genai.embed_content(
+                model=EMBED_MODEL,
+                content=chunks[i:i + EMBED_BATCH],
+                task_type="retrieval_document",
+            )
+            vectors.extend(result["embedding"])
+        embs = np.asarray(vectors, dtype=np.float32).reshape(len(chunks), -1)
+        embs /= np.linalg.norm(embs, axis=1, keepdims=True)
+        return chunks, embs
+    except Exception as e:
+        raise RuntimeError(f"Gemini embedding error: {e}")
+
+def top_k_chunks(chunks: List[str], embs: np.ndarray, query_vec: np.ndarray, k: int = 5) -> str:
+    """
+    Join the k chunks most similar to the query, kept in document order.
+    """
+    if len(chunks) <= k:
+        return "\n\n".join(chunks)
+    best = np.argpartition(embs @ query_vec, -k)[-k:]
+    return "\n\n".join(chunks[i] for i in sorted(best))
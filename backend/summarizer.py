@@ -1,17 +1,29 @@
-import google.generativeai as genai
+from backend.gemini_client import get_model
+
+def _build_prompt(text: str) -> str:
+    return f"Summarize the following document in no more than 150 words:\n\n{text}"
 
 def summarise_document(text: str, api_key: str) -> str:
     """
     Generate a ≤150-word summary using Gemini 1.5 Pro (latest).
+    Expects text already cut with gemini_client.truncate_for_prompt.
     """
-    genai.configure(api_key=api_key)
+    try:
+        model = get_model(api_key)
+
+        response = model.generate_content(_build_prompt(text))
+        return response.text.strip()
+    except Exception as e:
+        raise RuntimeError(f"Gemini summarization error: {e}")
 
+async def summarise_document_async(text: str, api_key: str) -> str:
+    """
+    Async variant of summarise_document, for running alongside other requests.
+    """
     try:
-        model = genai.GenerativeModel(model_name="models/gemini-1.5-flash-latest")
+        model = get_model(api_key)
 
-        response = model.generate_content(
-            f"Summarize the following document in no more than 150 words:\n\n{text[:12000]}"
-        )
+        response = await model.generate_content_async(_build_prompt(text))
         return response.text.strip()
     except Exception as e:
         raise RuntimeError(f"Gemini summarization error: {e}")